@@ -1,12 +1,19 @@
 import tkinter as tk
 from tkinter import messagebox
 import serial
-import time
+import struct
 import sys
 
 # --- CONFIGURATION ---
 SERIAL_PORT = '/dev/tty.usbmodem101'  # <--- CONFIRM THIS IS YOUR PORT!
-BAUD_RATE = 115200
+BAUD_RATE = 921600           # USB-CDC ignores it, but host drivers honour it
+FALLBACK_BAUD_RATE = 115200  # Used if the driver rejects BAUD_RATE
+
+# Raw REPL framing: entering prints the banner, every executed block ends with \x04>
+RAW_BANNER = b'raw REPL; CTRL-B to exit\r\n>'
+RAW_PROMPT = b'\x04>'
+INIT_TIMEOUT = 0.5    # s, upper bound while entering raw mode / running init code
+TOGGLE_TIMEOUT = 0.05 # s, upper bound for a single set_pin() round trip
 
 # This is the MicroPython code we inject into the ESP32 RAM on startup.
 # It defines a helper function (set_pin) for quick control.
@@ -26,67 +33,113 @@ def set_pin(pin_num, state):
     gpios[pin_num].value(1 if state else 0)
 """
 
+def has_error(response):
+    """True if a raw REPL response contains a MicroPython traceback/exception."""
+    # b'Error' also covers NameError, SyntaxError, ...
+    return b'Traceback' in response or b'Error' in response
+
 class ESP32Controller:
     def __init__(self, port):
+        self.raw_mode = False
         try:
-            self.ser = serial.Serial(port, BAUD_RATE, timeout=0.5) 
-            
-            # 1. Stop any running program
-            self.ser.write(b'\x03') 
-            time.sleep(0.05)
-            
-            # 2. Enter Raw REPL Mode (\x01 is Ctrl+A, which enters raw mode)
-            self.ser.write(b'\x01') 
-            time.sleep(0.05)
-            # Read and discard the "OK" response from entering raw REPL
-            self.ser.read_all()
-            
-            # 3. Send the initialization code as a complete block
-            # Raw REPL expects the code with newlines, terminated by Ctrl+D
-            self.ser.write(ESP_INIT_CODE.strip() + b'\n')
-            time.sleep(0.02)
-
-            # 4. Execute the code block and return to normal mode (\x04 is Ctrl+D)
-            self.ser.write(b'\x04') 
-            time.sleep(0.1) 
+            try:
+                self.ser = serial.Serial(port, BAUD_RATE, timeout=INIT_TIMEOUT)
+            except serial.SerialException:
+                self.ser = serial.Serial(port, FALLBACK_BAUD_RATE, timeout=INIT_TIMEOUT)
             
-            # Check for errors after execution
-            response = self.ser.read_all().decode('utf-8', errors='ignore')
-            if 'Traceback' in response or 'Error' in response or 'SyntaxError' in response:
-                 print(f"!!! CRITICAL ESP32 ERROR DURING INIT: {response.strip()}", file=sys.stderr)
+            # Enter Raw REPL once and inject the helper; we stay in raw mode afterwards
+            response = self.start_session()
+            if has_error(response):
+                 print(f"!!! CRITICAL ESP32 ERROR DURING INIT: {response.decode('utf-8', errors='replace').strip()}", file=sys.stderr)
                  # Raise an error to stop the GUI from running on a failed setup
                  raise ConnectionError("ESP32 setup failed. See error log above.")
         except serial.SerialException as e:
             messagebox.showerror("Connection Error", f"Could not open port {port}\n\n{e}")
             raise
 
+    def start_session(self):
+        """Enter Raw REPL, run ESP_INIT_CODE and return the raw response bytes."""
+        self.ser.timeout = INIT_TIMEOUT
+
+        # 1. Stop any running program
+        self.ser.write(b'\x03') 
+        
+        # 2. Enter Raw REPL Mode (\x01 is Ctrl+A, which enters raw mode)
+        self.ser.write(b'\x01') 
+        # Read and discard everything up to the raw REPL banner
+        self.ser.read_until(RAW_BANNER)
+        
+        # 3. Send the initialization code, preferring flow-controlled raw-paste mode
+        # (Ctrl+E, MicroPython >= 1.14). Same handshake as mpremote's pyboard.py.
+        self.ser.write(b'\x05A\x01')
+        reply = self.ser.read(2)
+        if reply == b'R\x01':
+            self.raw_paste_write(ESP_INIT_CODE.strip() + b'\n')
+        else:
+            if reply != b'R\x00':
+                # Firmware doesn't know raw-paste and treated it as input; re-sync on the
+                # banner it re-prints. read(2) already took its first bytes (b'ra'), so wait
+                # for the rest, like mpremote's b"w REPL; CTRL-B to exit\r\n>"
+                if RAW_BANNER.startswith(reply):
+                    self.ser.read_until(RAW_BANNER[len(reply):])
+                else:
+                    self.ser.read_until(RAW_BANNER)
+            # Plain raw REPL: the whole block followed by Ctrl+D
+            self.ser.write(ESP_INIT_CODE.strip() + b'\n\x04')
+
+        # The board stays in raw mode and answers with [OK]<out>\x04<err>\x04>
+        response = self.ser.read_until(RAW_PROMPT)
+
+        self.raw_mode = response.endswith(RAW_PROMPT)
+        self.ser.timeout = TOGGLE_TIMEOUT
+        return response
+
+    def raw_paste_write(self, code):
+        """Stream code in raw-paste mode, honouring the device's flow-control window."""
+        # Header is the little-endian window size; the device sends \x01 each time
+        # another window's worth of bytes may be sent
+        window_size = struct.unpack('<H', self.ser.read(2))[0]
+        window_remain = window_size
+
+        i = 0
+        while i < len(code):
+            while window_remain == 0 or self.ser.in_waiting:
+                data = self.ser.read(1)
+                if data == b'\x01':
+                    window_remain += window_size
+                elif data == b'\x04':
+                    # Device ended the paste early (e.g. compile error); acknowledge it
+                    self.ser.write(b'\x04')
+                    return
+                else:
+                    raise ConnectionError(f"Unexpected data during raw paste: {data!r}")
+            chunk = code[i:i + window_remain]
+            self.ser.write(chunk)
+            window_remain -= len(chunk)
+            i += len(chunk)
+
+        # End of data; the device acknowledges with \x04 then compiles and runs it
+        self.ser.write(b'\x04')
+        if not self.ser.read_until(b'\x04').endswith(b'\x04'):
+            raise ConnectionError("Could not complete raw paste")
+
     def toggle_pin(self, pin, state):
         val = 1 if state else 0
         
-        # Use Raw REPL for more reliable command execution
-        # 1. Enter Raw REPL
-        self.ser.write(b'\x01')  # Ctrl+A
-        time.sleep(0.03)
-        self.ser.read_all()  # Discard "OK"
-        
-        # 2. Send the command
-        cmd = f"set_pin({pin}, {val})\n"
-        self.ser.write(cmd.encode('utf-8'))
-        time.sleep(0.02)
+        # Only re-enter Raw REPL if the last exchange lost the prompt (reset/unplug)
+        if not self.raw_mode:
+            self.start_session()
         
-        # 3. Execute with Ctrl+D
-        self.ser.write(b'\x04')
-        time.sleep(0.08)
+        # Send the command and execute it with Ctrl+D in a single write
+        self.ser.write(f"set_pin({pin},{val})\r\x04".encode())
         
-        # 4. Read response and check for errors only
-        raw_bytes = self.ser.read_all()
-        if raw_bytes:
-            try:
-                decoded = raw_bytes.decode('utf-8', errors='replace')
-                if 'Traceback' in decoded or 'Error' in decoded or 'NameError' in decoded:
-                    print(f"ESP32 ERROR: {decoded.strip()}", file=sys.stderr)
-            except Exception as e:
-                print(f"Decode error: {e}", file=sys.stderr) 
+        # Read response until the raw REPL prompt and check for errors only
+        raw_bytes = self.ser.read_until(RAW_PROMPT)
+        if not raw_bytes.endswith(RAW_PROMPT):
+            self.raw_mode = False
+        # Only decode on the error path
+        if has_error(raw_bytes):
+            print(f"ESP32 ERROR: {raw_bytes.decode('utf-8', errors='replace').strip()}", file=sys.stderr)
 
 class GPIOApp:
     def __init__(self, root, controller):
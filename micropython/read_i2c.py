@@ -1,10 +1,12 @@
 import serial
-import time
+import ast
+import os
 import sys
 
 # --- CONFIGURATION ---
 SERIAL_PORT = '/dev/tty.usbmodem101'  # Match the port from espgui.py
-BAUD_RATE = 115200
+BAUD_RATE = 921600           # USB-CDC ignores it, but host drivers honour it
+FALLBACK_BAUD_RATE = 115200  # Used if the driver rejects BAUD_RATE
 
 # I2C PIN CONFIGURATION (Change these to match your wiring!)
 # Common ESP32-S3 defaults might be SDA=8, SCL=9 or SDA=42, SCL=41 depending on the board.
@@ -12,21 +14,43 @@ PIN_SDA = 1  # Example: GPIO 1
 PIN_SCL = 2  # Example: GPIO 2
 I2C_FREQ = 100000
 
+# Raw REPL framing: entering prints the banner, every executed block ends with \x04>
+RAW_BANNER = b'raw REPL; CTRL-B to exit\r\n>'
+RAW_PROMPT = b'\x04>'
+
+def set_low_latency(port):
+    """Drop the usb-serial latency timer to 1 ms (Linux FTDI-style adapters only)"""
+    if not sys.platform.startswith('linux'):
+        return
+    path = f"/sys/bus/usb-serial/devices/{os.path.basename(os.path.realpath(port))}/latency_timer"
+    try:
+        with open(path, 'w') as f:
+            f.write('1')
+    except OSError:
+        # Native USB-CDC ports have no latency timer, and writing it may need root
+        pass
+
+
 class ESPI2C:
     def __init__(self, port=SERIAL_PORT, baud=BAUD_RATE):
-        self.ser = serial.Serial(port, baud, timeout=1)
+        # read_until returns as soon as the sentinel arrives; the timeout only bounds failures
+        try:
+            self.ser = serial.Serial(port, baud, timeout=0.5)
+        except serial.SerialException:
+            self.ser = serial.Serial(port, FALLBACK_BAUD_RATE, timeout=0.5)
+        self._raw_mode = False
+        set_low_latency(port)
         self.connect_and_init()
 
     def connect_and_init(self):
         print(f"Connecting to {self.ser.port}...")
         # 1. Stop any running program (Ctrl+C)
         self.ser.write(b'\x03')
-        time.sleep(0.1)
         
         # 2. Enter Raw REPL Mode (Ctrl+A)
         self.ser.write(b'\x01')
-        time.sleep(0.1)
-        self.ser.read_all() # Clear buffer
+        self.ser.read_until(RAW_BANNER) # Clear buffer up to the raw REPL banner
+        self._raw_mode = True
 
         # 3. Define the I2C setup code
         # We use SoftI2C for maximum compatibility with any pins
@@ -38,29 +62,43 @@ try:
     status = "OK"
 except Exception as e:
     status = str(e)
+
+# Batched reads: one REPL round trip for many registers. Buffers are allocated
+# once per read size and reused via readfrom_mem_into.
+_bufs = {{}}
+def read_many(reads):
+    out = []
+    for addr, reg, n in reads:
+        buf = _bufs.get(n)
+        if buf is None:
+            buf = _bufs[n] = bytearray(n)
+        i2c.readfrom_mem_into(addr, reg, buf)
+        out.append(buf.hex())
+    print(out)
 """
         self.exec_raw(init_code)
         print("I2C initialized on ESP32.")
 
     def exec_raw(self, code):
         """Execute code in Raw REPL and return output"""
-        # Ctrl+A to ensure we are in raw mode
-        self.ser.write(b'\x01')
-        time.sleep(0.05)
-        self.ser.read_all() # Clear "OK"
+        try:
+            # Ctrl+A only if we are not already in raw mode (raw REPL persists between calls)
+            if not self._raw_mode:
+                self.ser.write(b'\x01')
+                self.ser.read_until(RAW_BANNER) # Clear banner
+                self._raw_mode = True
 
-        # Send code
-        self.ser.write(code.encode('utf-8') + b'\x04') # Ctrl+D to execute
-        
-        # Wait for execution to finish (look for \x04)
-        ret = b""
-        while True:
-            if self.ser.in_waiting > 0:
-                chunk = self.ser.read(self.ser.in_waiting)
-                ret += chunk
-                if ret.endswith(b'\x04>'): # End of raw repl output
-                    break
-            time.sleep(0.01)
+            # Send code
+            self.ser.write(code.encode('utf-8') + b'\x04') # Ctrl+D to execute
+            
+            # Block until execution finishes (End of raw repl output is \x04>)
+            ret = self.ser.read_until(RAW_PROMPT)
+            if not ret.endswith(RAW_PROMPT):
+                raise RuntimeError(f"ESP32 did not answer within {self.ser.timeout}s: {ret!r}")
+        except Exception:
+            # Unknown board state, re-enter raw mode on the next call
+            self._raw_mode = False
+            raise
         
         # Parse response
         # Format is: OK<output>\x04<error>\x04>
@@ -88,7 +126,7 @@ except Exception as e:
             # Result should be a string like "[8, 32, ...]"
             # Evaluate it safely
             if result:
-                return eval(result)
+                return ast.literal_eval(result)
             return []
         except Exception as e:
             print(f"Scan failed: {e}")
@@ -107,6 +145,18 @@ except Exception as e:
             print(f"Read failed: {e}")
             return None
             
+    def read_many(self, reads):
+        """Read several (address, register, num_bytes) blocks in one round trip.
+        Returns a list of bytes in the same order, or None on failure"""
+        code = f"read_many({[tuple(r) for r in reads]!r})"
+        try:
+            result = self.exec_raw(code)
+            # Result is a list of hex strings like "['0a1b', 'ff']"
+            return [bytes.fromhex(h) for h in ast.literal_eval(result)]
+        except Exception as e:
+            print(f"Batch read failed: {e}")
+            return None
+
     def write_to_mem(self, address, register, data_byte):
         """Write a byte to a register"""
         code = f"i2c.writeto_mem({address}, {register}, bytes([{data_byte}]))"
@@ -136,6 +186,8 @@ if __name__ == "__main__":
         #     # Try reading register 0x00 (often ID or Status)
         #     data = esp.read_from_mem(target, 0x00, 1)
         #     print(f"Data at 0x00: {data}")
+        #     # Several registers in one round trip, e.g. 6 bytes from 0x3B and 2 from 0x41
+        #     print(esp.read_many([(target, 0x3B, 6), (target, 0x41, 2)]))
 
     except Exception as e:
         print(f"Error: {e}")
@@ -1,10 +1,11 @@
 from adafruit_httpserver import Server, FileResponse, Request, Response, Websocket, OK_200, Headers, Status
 from adafruit_motor import servo
 from random import choice
+from errno import EAGAIN
 
 import pwmio
 import time
-import json
+from json import loads as json_loads
 import digitalio
 import espcamera
 import board
@@ -26,6 +27,16 @@ FRAME_SIZE = espcamera.FrameSize.HVGA # 480x320p
 
 # FRAME_SIZE = espcamera.FrameSize.UXGA
 
+# Thermal throttling (see print_temp): coarser JPEG, then a smaller frame, when hot
+JPEG_QUALITY = 20
+JPEG_QUALITY_HOT = 30
+HOT_TEMP_C = 75
+FRAME_SIZE_HOT = espcamera.FrameSize.QVGA # 320x240p
+VERY_HOT_TEMP_C = 85
+# Each stage switches back only once the die is this much below its threshold,
+# so a temperature hovering at a threshold doesn't toggle (and reconfigure) every second
+TEMP_HYSTERESIS_C = 5
+
 i2c = busio.I2C(board.CAM_SCL, board.CAM_SDA)
 
 cam = espcamera.Camera(
@@ -40,10 +51,12 @@ cam = espcamera.Camera(
     external_clock_frequency=20_000_000,
     grab_mode=espcamera.GrabMode.WHEN_EMPTY,
     framebuffer_count=2,
-    jpeg_quality=20)
+    jpeg_quality=JPEG_QUALITY)
 
 cam.vflip = True
 
+_CRLF = b"\r\n"
+
 class XMixedReplaceResponse(Response):
     def __init__(
         self,
@@ -53,6 +66,7 @@ class XMixedReplaceResponse(Response):
         status: Union[Status, Tuple[int, str]] = OK_200,
         headers: Union[Headers, Dict[str, str]] = None,
         cookies: Dict[str, str] = None,
+        boundary: str = None,
     ) -> None:
         super().__init__(
             request=request,
@@ -60,27 +74,77 @@ class XMixedReplaceResponse(Response):
             cookies=cookies,
             status=status,
         )
-        self._boundary = self._get_random_boundary()
+        self._boundary = boundary or self._get_random_boundary()
         self._headers.setdefault(
             "Content-Type", f"multipart/x-mixed-replace; boundary={self._boundary}"
         )
         self._frame_content_type = frame_content_type
+        # Unsent tail of the part in flight (memoryview), resumed by send_pending()
+        self._pending = None
+        # Boundary line + part header are the same for every frame of this response
+        self._frame_header = bytes(
+            f"{self._boundary}\r\nContent-Type: {frame_content_type}\r\n\r\n", "utf-8"
+        )
 
     @staticmethod
     def _get_random_boundary() -> str:
         symbols = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
         return "--" + "".join([choice(symbols) for _ in range(16)])
 
-    def send_frame(self, frame: Union[str, bytes] = "") -> None:
-        encoded_frame = bytes(frame.encode("utf-8") if isinstance(frame, str) else frame)
+    def frame_payload(self, frame: Union[str, bytes] = "") -> bytearray:
+        """Boundary, part header, frame and trailer as one buffer."""
+        # cam.take() already returns a buffer; don't copy it into bytes first
+        encoded_frame = frame.encode("utf-8") if isinstance(frame, str) else frame
+
+        # One allocation, one copy of the JPEG. Chained + would copy it twice, and
+        # bytes.join rejects the memoryview cam.take() returns on MicroPython.
+        header = self._frame_header
+        start = len(header)
+        end = start + len(encoded_frame)
+        payload = bytearray(end + len(_CRLF))
+        payload[:start] = header
+        payload[start:end] = encoded_frame
+        payload[end:] = _CRLF
+        return payload
+
+    def send_payload(self, payload: bytes) -> bool:
+        """
+        Send one MJPEG part on the non-blocking stream socket.
+        Returns False if the frame was skipped because the viewer is still
+        draining the previous one (or its buffer is full).
+        """
+        if self._pending is not None and not self.send_pending():
+            return False
+        sent = self._send_some(payload)
+        if sent == 0:
+            return False
+        if sent < len(payload):
+            # A JPEG is bigger than the TCP send window, so this is the common case;
+            # keep the rest and finish it on later passes instead of spinning here
+            self._pending = memoryview(payload)[sent:]
+        return True
+
+    def send_pending(self) -> bool:
+        """
+        One non-blocking send of the unsent rest of the current part.
+        Returns True once nothing is left.
+        """
+        if self._pending is not None:
+            sent = self._send_some(self._pending)
+            self._pending = self._pending[sent:] if sent < len(self._pending) else None
+        return self._pending is None
+
+    def _send_some(self, data) -> int:
+        # EAGAIN means "try later"; anything else (ECONNRESET, broken pipe...) propagates
+        try:
+            return self._request.connection.send(data)
+        except OSError as exc:
+            if exc.errno == EAGAIN:
+                return 0
+            raise
 
-        self._send_bytes(self._request.connection, bytes(f"{self._boundary}\r\n", "utf-8"))
-        self._send_bytes(
-            self._request.connection,
-            bytes(f"Content-Type: {self._frame_content_type}\r\n\r\n", "utf-8"),
-        )
-        self._send_bytes(self._request.connection, encoded_frame)
-        self._send_bytes(self._request.connection, bytes("\r\n", "utf-8"))
+    def send_frame(self, frame: Union[str, bytes] = "") -> None:
+        self.send_payload(self.frame_payload(frame))
 
     def _send(self) -> None:
         self._send_headers()
@@ -91,10 +155,13 @@ class XMixedReplaceResponse(Response):
 wifi.radio.connect('NETGEAR93', 'helpfullotus935')
 print(f"Successfully connected to WiFi with IP Address: {wifi.radio.ipv4_address}!")
 
-server = Server(socketpool.SocketPool(wifi.radio), '/website', debug=True)
+pool = socketpool.SocketPool(wifi.radio)
+server = Server(pool, '/website', debug=True)
 
 websockets = []
 stream_connections = []
+# Shared by every stream so a frame is framed once and broadcast as-is
+STREAM_BOUNDARY = XMixedReplaceResponse._get_random_boundary()
 
 # @server.route('/', 'GET')
 # def home(request: Request):
@@ -104,6 +171,8 @@ stream_connections = []
 @server.route('/websocket', 'GET')
 def websockets_route(request: Request):
     print(f"{request.client_address} made a websocket connection!")
+    # Servo commands are tiny; don't let Nagle hold them back
+    request.connection.setsockopt(pool.IPPROTO_TCP, pool.TCP_NODELAY, 1)
     websocket = Websocket(request)
     websockets.append(websocket)
     return websocket
@@ -117,8 +186,12 @@ def frame_handler(request: Request):
 
 @server.route("/stream")
 def stream_handler(request: Request):
-    response = XMixedReplaceResponse(request, frame_content_type="image/jpeg")
+    response = XMixedReplaceResponse(request, frame_content_type="image/jpeg", boundary=STREAM_BOUNDARY)
     stream_connections.append(response)
+    # A slow viewer should drop frames, not stall the capture loop for everyone
+    request.connection.setblocking(False)
+    # Each frame goes out as one buffer; send it now rather than coalescing with the next
+    request.connection.setsockopt(pool.IPPROTO_TCP, pool.TCP_NODELAY, 1)
 
     return response
 
@@ -126,19 +199,32 @@ server.start(str(wifi.radio.ipv4_address), port=80)
 
 async def send_stream_frames():
     while True:
-        frame = cam.take(0.1)
-        if frame:
-            for connection in iter(stream_connections):
+        # Non-blocking: with framebuffer_count=2 and WHEN_EMPTY the driver fills the
+        # other buffer in the background, so the camera paces the loop instead of a sleep
+        frame = cam.take(0)
+        # All streams share STREAM_BOUNDARY: build the MJPEG part once per frame
+        payload = stream_connections[0].frame_payload(frame) if frame and stream_connections else None
+        dead = []
+        for connection in stream_connections:
+            try:
+                if payload is not None:
+                    # Skipped for this viewer while it still drains the previous part
+                    connection.send_payload(payload)
+                else:
+                    connection.send_pending()
+            except OSError:
+                # EAGAIN never gets here (_send_some absorbs it), so any error means the
+                # viewer is gone: reset, broken pipe, or ENOTCONN/ETIMEDOUT after it left Wi-Fi.
+                # Never let it escape and end the gather() that also runs the servo task.
                 try:
-                    connection.send_frame(frame)
-                except BrokenPipeError:
                     connection.close()
-                    stream_connections.remove(connection)
-        else:
-            print('dropped frame')
-        # await asyncio.sleep(1/60) # 60 fps
-        await asyncio.sleep(0.05) # 20 fps
-        # await asyncio.sleep(0.2) # 5 fps
+                except OSError:
+                    pass
+                dead.append(connection)
+        # Prune after the loop; removing while iterating skips the next viewer
+        if dead:
+            stream_connections[:] = [c for c in stream_connections if c not in dead]
+        await asyncio.sleep(0.005 if frame is None else 0)
 
 
 async def handle_http_requests():
@@ -157,22 +243,30 @@ my_servo = servo.Servo(pwm)
 async def handle_websocket_requests():
     while True:
         removing = []
+        received = False
         for websocket in websockets:
-            try:
-                packet = json.loads(websocket.receive())
-            except (ValueError, TypeError):
-                packet = None
+            # Websocket sockets are non-blocking: receive() returns None when idle,
+            # so only parse JSON when a message actually arrived
+            message = websocket.receive(fail_silently=True)
+            packet = None
+            if message:
+                received = True
+                try:
+                    packet = json_loads(message)
+                except (ValueError, TypeError):
+                    pass
 
             if websocket.closed:
                 removing.append(websocket)
             elif packet:
                 # 0 is closed, 180 is fully opened
-                angle = max(min(150, packet['angle']), 0)
+                angle = int(max(0, min(150, packet['angle'])))
                 print(f"Setting motor angle to {angle}")
                 my_servo.angle = angle
         for remove in removing:
             websockets.remove(remove)
-        await asyncio.sleep(0)
+        # Back off while idle instead of spinning; stay hot while commands stream in
+        await asyncio.sleep(0 if received else 0.01)
 
 # async def move_servo():
 #     print('moving servo')
@@ -185,8 +279,29 @@ async def handle_websocket_requests():
 #         await asyncio.sleep(1)
 
 async def print_temp():
+    # Only task that touches quality/frame_size, and asyncio is single-threaded,
+    # so no locking is needed against send_stream_frames
+    hot = False
+    very_hot = False
     while True:
-        print(f"Temperature: {microcontroller.cpu.temperature:.2f} °C", end='\r')
+        temp = microcontroller.cpu.temperature
+        print(f"Temperature: {temp:.2f} °C", end='\r')
+
+        if temp > HOT_TEMP_C:
+            hot = True
+        elif temp < HOT_TEMP_C - TEMP_HYSTERESIS_C:
+            hot = False
+        quality = JPEG_QUALITY_HOT if hot else JPEG_QUALITY
+        if cam.quality != quality:
+            cam.quality = quality
+
+        # reconfigure() reallocates the frame buffers and interrupts the stream
+        if temp > VERY_HOT_TEMP_C and not very_hot:
+            very_hot = True
+            cam.reconfigure(frame_size=FRAME_SIZE_HOT)
+        elif temp < VERY_HOT_TEMP_C - TEMP_HYSTERESIS_C and very_hot:
+            very_hot = False
+            cam.reconfigure(frame_size=FRAME_SIZE)
         await asyncio.sleep(1)
 
 async def main():
@@ -2,11 +2,15 @@ import serial
 import time
 
 port = '/dev/tty.usbmodem2101'
-serial_port = serial.Serial(port, 921600, timeout=0.1)
+serial_port = serial.Serial(port, 921600, timeout=0.1, write_timeout=0.1)
 
-serial_port.write('P10:1'.encode())
+# Newline-terminated like gui.py, so the firmware's readStringUntil('\n') returns
+# immediately; flush() blocks until the OS has handed the bytes to the USB stack
+serial_port.write(b'P10:1\n')
+serial_port.flush()
 time.sleep(0.5)
-serial_port.write('P10:0'.encode())
+serial_port.write(b'P10:0\n')
+serial_port.flush()
 time.sleep(0.5)
 
 serial_port.close()
@@ -1,6 +1,7 @@
+import math
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.optimize import root_scalar
+from numba import njit
 
 # --- Constants ---
 GAMMA = 1.4
@@ -19,24 +20,174 @@ epsilon = roughness_mm / 1000.0
 P_supply_psi = 10.153
 P0_pa = (P_supply_psi * 6894.76) + P_ATM
 
+# --- Precomputed invariants (scalar math below uses `math`, not NumPy ufuncs) ---
+INV_PI_D_MU = 4.0 / (math.pi * D * MU)   # Re = INV_PI_D_MU * m_dot
+SQRT_GAMMA = math.sqrt(GAMMA)
+GM1_2 = (GAMMA - 1) / 2
+GP1 = GAMMA + 1
+EXP_P = -(GAMMA + 1) / (2 * (GAMMA - 1))
+EXP_ISEN = -GAMMA / (GAMMA - 1)
+FANNO_LOG_COEFF = (GAMMA + 1) / (2 * GAMMA)
+
 
 # --- 1. Fanno Flow Solver (The "Ground Truth") ---
+# Module-level globals are frozen into the compiled code; the on-disk cache is
+# invalidated whenever this file changes.
+@njit(cache=True)
 def get_fanno_parameter(M):
     if M <= 0 or M >= 1: return np.inf
-    term1 = (1 - M**2) / (GAMMA * M**2)
-    term2 = (GAMMA + 1) / (2 * GAMMA) * np.log(((GAMMA + 1) * M**2) / (2 + (GAMMA - 1) * M**2))
+    M2 = M * M
+    term1 = (1 - M2) / (GAMMA * M2)
+    term2 = FANNO_LOG_COEFF * math.log((GP1 * M2) / (2 + (GAMMA - 1) * M2))
     return term1 + term2
 
+@njit(cache=True, fastmath=True)
 def friction_factor_haaland(Re, D, eps):
-    if Re < 2300: return 64.0 / Re if Re > 0 else 0
+    if Re < 2300: return 64.0 / Re if Re > 0 else 0.0
     term = (eps / (3.7 * D))**1.11 + (6.9 / Re)
-    return (-1.8 * np.log10(term))**-2
+    return (-1.8 * math.log10(term))**-2
 
+@njit(cache=True, fastmath=True)
 def calculate_mass_flow(M, P_stag, T_stag, Area):
-    term = (1 + (GAMMA-1)/2 * M**2)**(-(GAMMA+1)/(2*(GAMMA-1)))
-    return Area * P_stag / np.sqrt(R * T_stag) * np.sqrt(GAMMA) * M * term
+    term = (1 + GM1_2 * M * M)**EXP_P
+    return Area * P_stag / math.sqrt(R * T_stag) * SQRT_GAMMA * M * term
+
+# Residuals take L_m (or the Fanno target) as an explicit argument instead of
+# closing over it, so the solvers can call them without leaving compiled code.
+@njit(cache=True)
+def choked_resid(m1, L_m):
+    m_dot = calculate_mass_flow(m1, P0_pa, T0, A)
+    Re = INV_PI_D_MU * m_dot
+    f = friction_factor_haaland(Re, D, epsilon)
+    return get_fanno_parameter(m1) - (4 * f * L_m / D)
+
+# Inverse Fanno lookup: Fanno(M) is monotone decreasing on (0, 1), so M2 for a
+# given remaining friction parameter comes from interpolating a table instead of
+# a nested root solve. The grid is log-spaced away from both M=1e-4 and M=1,
+# where M(Fanno) changes fastest (max relative error in M ~1e-5).
+_M_HALF = np.geomspace(1e-4, 0.5, 2048)
+M_TABLE = np.unique(np.concatenate((_M_HALF, 1 - _M_HALF)))
+FANNO_TABLE = np.array([get_fanno_parameter(m) for m in M_TABLE])
+# np.interp needs ascending x
+FANNO_ASC = FANNO_TABLE[::-1].copy()
+M_DESC = M_TABLE[::-1].copy()
+
+@njit(cache=True)
+def subsonic_resid(m1, L_m):
+    m_dot = calculate_mass_flow(m1, P0_pa, T0, A)
+    Re = INV_PI_D_MU * m_dot
+    f = friction_factor_haaland(Re, D, epsilon)
+    
+    fanno_1 = get_fanno_parameter(m1)
+    fanno_2_needed = fanno_1 - (4 * f * L_m / D)
+    
+    if fanno_2_needed < 0: return -1e9 # Impossible
+    
+    # Find M2 from Fanno(M2)
+    # Fanno decreases with M, and M2 > M1 since fanno_2_needed < fanno_1
+    m2 = np.interp(fanno_2_needed, FANNO_ASC, M_DESC)
+        
+    # Check Pressure
+    P1 = P0_pa * (1 + GM1_2 * m1**2)**EXP_ISEN
+    P2 = P1 * (m1/m2) * math.sqrt((2+(GAMMA-1)*m1**2)/(2+(GAMMA-1)*m2**2))
+    return P2 - P_ATM
+
+# The solvers pick the residual by id instead of taking it as an argument: a
+# function argument makes Numba compile a fresh, uncacheable specialisation on
+# every run, which cost more than the whole sweep.
+CHOKED = 0
+SUBSONIC = 1
+
+@njit(cache=True)
+def residual(kind, m1, L_m):
+    if kind == CHOKED:
+        return choked_resid(m1, L_m)
+    return subsonic_resid(m1, L_m)
+
+@njit(cache=True)
+def brentq(kind, xa, xb, arg, xtol=2e-12, rtol=8.9e-16, maxiter=100):
+    """Brent's method on residual(kind, x, arg), ported from scipy's C brentq.
+    Returns nan instead of raising when [xa, xb] does not bracket a root."""
+    xpre, xcur = xa, xb
+    xblk = fblk = spre = scur = 0.0
+    fpre = residual(kind, xpre, arg)
+    fcur = residual(kind, xcur, arg)
+    if fpre * fcur > 0: return math.nan
+    if fpre == 0: return xpre
+    if fcur == 0: return xcur
+
+    for _ in range(maxiter):
+        if fpre * fcur < 0:
+            xblk = xpre
+            fblk = fpre
+            spre = scur = xcur - xpre
+        if abs(fblk) < abs(fcur):
+            xpre, xcur, xblk = xcur, xblk, xcur
+            fpre, fcur, fblk = fcur, fblk, fcur
 
-def solve_fanno(L_m):
+        delta = (xtol + rtol * abs(xcur)) / 2
+        sbis = (xblk - xcur) / 2
+        if fcur == 0 or abs(sbis) < delta:
+            return xcur
+
+        if abs(spre) > delta and abs(fcur) < abs(fpre):
+            if xpre == xblk:
+                # Secant step
+                stry = -fcur * (xcur - xpre) / (fcur - fpre)
+            else:
+                # Inverse quadratic interpolation
+                dpre = (fpre - fcur) / (xpre - xcur)
+                dblk = (fblk - fcur) / (xblk - xcur)
+                stry = -fcur * (fblk * dblk - fpre * dpre) / (dblk * dpre * (fblk - fpre))
+            if 2 * abs(stry) < min(abs(spre), 3 * abs(sbis) - delta):
+                spre = scur
+                scur = stry
+            else:
+                spre = scur = sbis
+        else:
+            # Bisection
+            spre = scur = sbis
+
+        xpre = xcur
+        fpre = fcur
+        if abs(scur) > delta:
+            xcur += scur
+        else:
+            xcur += delta if sbis > 0 else -delta
+        fcur = residual(kind, xcur, arg)
+    return xcur
+
+@njit(cache=True)
+def secant(kind, x0, arg, lo, hi, xtol=1e-10, maxiter=20):
+    """Secant (derivative-free Newton) iteration on residual(kind, x, arg) from x0.
+    Returns nan if it does not converge inside (lo, hi)."""
+    x1 = x0 * (1 + 1e-4)
+    f0 = residual(kind, x0, arg)
+    f1 = residual(kind, x1, arg)
+    for _ in range(maxiter):
+        if f1 == f0: return math.nan
+        x2 = x1 - f1 * (x1 - x0) / (f1 - f0)
+        if not lo < x2 < hi: return math.nan
+        if abs(x2 - x1) < xtol: return x2
+        x0, f0 = x1, f1
+        x1 = x2
+        f1 = residual(kind, x1, arg)
+    return math.nan
+
+def solve_m1(kind, L_m, lo, hi, x0=None):
+    """Root of residual(kind, m1, L_m) on [lo, hi].
+    A warm start x0 converges in a few secant steps; falls back to brentq if
+    there is no guess or the iteration diverges / leaves the bracket."""
+    if x0 is not None and lo < x0 < hi:
+        m1 = secant(kind, x0, L_m, lo, hi)
+        if not math.isnan(m1):
+            return m1
+    return brentq(kind, lo, hi, L_m)
+
+def solve_fanno(L_m, warm=None):
+    # warm: optional dict carrying the previous M1 roots ('choked', 'sub') between
+    # calls with neighbouring L_m; it is updated in place with the new roots.
+    if warm is None: warm = {}
     # Iterative solver for Fanno flow
     def find_M1(m1_guess):
         m_dot = calculate_mass_flow(m1_guess, P0_pa, T0, A)
@@ -61,23 +212,16 @@ def solve_fanno(L_m):
         return 0 # Placeholder structure, better logic below
     
     # Robust Logic:
-    # 1. Find the Limiting M1 (Choked case)
-    def choked_resid(m1):
-        m_dot = calculate_mass_flow(m1, P0_pa, T0, A)
-        Re = 4 * m_dot / (np.pi * D * MU)
-        f = friction_factor_haaland(Re, D, epsilon)
-        return get_fanno_parameter(m1) - (4 * f * L_m / D)
-
-    try:
-        sol_limit = root_scalar(choked_resid, bracket=[0.0001, 0.999], method='brentq')
-        M1_choked = sol_limit.root
-    except:
+    # 1. Find the Limiting M1 (Choked case, see choked_resid)
+    M1_choked = solve_m1(CHOKED, L_m, 0.0001, 0.999, warm.get('choked'))
+    if math.isnan(M1_choked):
         return np.nan # Solver failed
+    warm['choked'] = M1_choked
 
     # Calculate Exit Pressure for this Choked Case
-    P1 = P0_pa * (1 + (GAMMA-1)/2 * M1_choked**2)**(-GAMMA/(GAMMA-1))
+    P1 = P0_pa * (1 + GM1_2 * M1_choked**2)**EXP_ISEN
     # P*/P1 = M1 * sqrt(...)
-    P_star = P1 * M1_choked * np.sqrt((2 + (GAMMA-1)*M1_choked**2)/(GAMMA+1))
+    P_star = P1 * M1_choked * math.sqrt((2 + (GAMMA-1)*M1_choked**2)/GP1)
     
     if P_star >= P_ATM:
         # It is choked
@@ -85,37 +229,30 @@ def solve_fanno(L_m):
         return m_dot / RHO_STD
     else:
         # It is Subsonic
-        # Solve for M1 such that P_exit = P_ATM
-        def subsonic_resid(m1):
-            m_dot = calculate_mass_flow(m1, P0_pa, T0, A)
-            Re = 4 * m_dot / (np.pi * D * MU)
-            f = friction_factor_haaland(Re, D, epsilon)
-            
-            fanno_1 = get_fanno_parameter(m1)
-            fanno_2_needed = fanno_1 - (4 * f * L_m / D)
-            
-            if fanno_2_needed < 0: return -1e9 # Impossible
-            
-            # Find M2 from Fanno(M2)
-            # Fanno decreases with M. 
-            def find_m2(m): return get_fanno_parameter(m) - fanno_2_needed
-            try:
-                # M2 > M1
-                m2 = root_scalar(find_m2, bracket=[m1, 0.9999], method='brentq').root
-            except:
-                return -1e9
-                
-            # Check Pressure
-            P1 = P0_pa * (1 + (GAMMA-1)/2 * m1**2)**(-GAMMA/(GAMMA-1))
-            P2 = P1 * (m1/m2) * np.sqrt((2+(GAMMA-1)*m1**2)/(2+(GAMMA-1)*m2**2))
-            return P2 - P_ATM
-
-        try:
-            sol_sub = root_scalar(subsonic_resid, bracket=[0.0001, M1_choked], method='brentq')
-            m_dot = calculate_mass_flow(sol_sub.root, P0_pa, T0, A)
-            return m_dot / RHO_STD
-        except:
+        # Solve for M1 such that P_exit = P_ATM (see subsonic_resid)
+        M1_sub = solve_m1(SUBSONIC, L_m, 0.0001, M1_choked, warm.get('sub'))
+        if math.isnan(M1_sub):
             return np.nan
+        warm['sub'] = M1_sub
+        m_dot = calculate_mass_flow(M1_sub, P0_pa, T0, A)
+        return m_dot / RHO_STD
+
+def _sweep_fanno_chunk(lengths):
+    warm = {}
+    return [solve_fanno(l, warm) for l in lengths]
+
+def sweep_fanno(lengths, n_jobs=1):
+    """solve_fanno over ascending lengths, warm-starting each solve from the last.
+    With n_jobs != 1 the sweep is split into contiguous chunks solved in parallel
+    (joblib), each chunk keeping its own warm start. Worker start-up costs far more
+    than a short sweep, so only use it for dense sweeps."""
+    if n_jobs == 1:
+        return _sweep_fanno_chunk(lengths)
+    # Imported here so the serial path doesn't pay for importing joblib
+    from joblib import Parallel, delayed, effective_n_jobs
+    chunks = [c for c in np.array_split(np.asarray(lengths), effective_n_jobs(n_jobs)) if len(c)]
+    results = Parallel(n_jobs=n_jobs)(delayed(_sweep_fanno_chunk)(c) for c in chunks)
+    return [q for chunk in results for q in chunk]
 
 # --- 2. Isothermal Compressible Flow Solver ---
 def solve_isothermal(L_m):
@@ -127,7 +264,7 @@ def solve_isothermal(L_m):
     
     m_dot_guess = 0.005 # Init
     for _ in range(10):
-        Re = 4 * m_dot_guess / (np.pi * D * MU)
+        Re = INV_PI_D_MU * m_dot_guess
         f = friction_factor_haaland(Re, D, epsilon)
         print(f"{_}: f={f}, m_dot_guess{m_dot_guess}")
         
@@ -151,13 +288,14 @@ def solve_isothermal_simple(L_m):
 
 
 # --- RUN COMPARISON ---
+# Ascending, so each solve_fanno warm-starts from its neighbour's M1.
+# 20 points solve in milliseconds; pass n_jobs=-1 for dense sweeps.
 lengths = np.linspace(0.2, 3.0, 20)
-results_fanno = []
+results_fanno = sweep_fanno(lengths)
 results_iso = []
 results_iso_simple = []
 
 for l in lengths:
-    results_fanno.append(solve_fanno(l))
     results_iso.append(solve_isothermal(l))
     results_iso_simple.append(solve_isothermal_simple(l))
 
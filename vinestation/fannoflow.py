@@ -8,8 +8,13 @@ Usage:
     result = compute_flow(diameter_mm=5.0, length_m=1.0, P_inlet_psi=10, P_outlet_pa=101325)
 """
 
+import math
+from collections import namedtuple
+from functools import lru_cache
+
 import numpy as np
-from scipy.optimize import root_scalar
+from numba import vectorize
+from scipy.optimize import brentq
 import pygasflow.fanno as fanno
 import pygasflow.isentropic as isentropic
 
@@ -19,8 +24,88 @@ R = 287.05           # Gas constant for air (J/kg·K)
 MU = 1.81e-5         # Dynamic viscosity of air (Pa·s)
 RHO_STD = 1.204      # Standard air density (kg/m³)
 P_ATM = 101325.0     # Atmospheric pressure (Pa)
+PA_PER_PSI = 6894.757293168361  # Pa per psi (1 lbf/in², exact)
+INV_PA_PER_PSI = 1.0 / PA_PER_PSI
 T0_K=293.15
 
+# Result of compute_flow (scalars) and compute_flow_vec (arrays).
+# error is None on success, otherwise a message and the flow fields are NaN.
+FlowResult = namedtuple('FlowResult', ['Q_std', 'Q_slpm', 'm_dot', 'M_inlet', 'M_outlet',
+                                       'choked', 'P_exit', 'error'])
+
+# --- Mach-number lookup tables (built once, on first use) ---
+# The residuals in compute_flow are evaluated dozens of times per root solve, so
+# for the default gamma the pygasflow relations are tabulated once and
+# interpolated. The grid is log-spaced towards both M=1e-4 and M=1, where the
+# Fanno relations change fastest.
+_TABLE_BUILT = False
+_M_GRID = None        # ascending Mach grid on [1e-4, 1]
+_FP_OF_M = None       # 4fL*/D at _M_GRID
+_P_OVER_PSTAR = None  # P/P* (Fanno) at _M_GRID
+_P_OVER_P0 = None     # P/P0 (isentropic) at _M_GRID
+_FP_DESC = None       # _FP_OF_M reversed (ascending) for the inverse lookup
+_M_DESC = None        # _M_GRID reversed to match _FP_DESC
+
+
+def _build_tables():
+    global _TABLE_BUILT, _M_GRID, _FP_OF_M, _P_OVER_PSTAR, _P_OVER_P0, _FP_DESC, _M_DESC
+    half = np.geomspace(1e-4, 0.5, 2048)
+    # M = 1 itself (4fL*/D = 0, P/P* = 1) closes the grid, so a fully consumed
+    # friction parameter lands exactly on the sonic state used by the choke check
+    _M_GRID = np.unique(np.concatenate((half, 1 - half, [1.0])))
+    _FP_OF_M = np.asarray(fanno.critical_friction_parameter(_M_GRID, GAMMA), dtype=float)
+    _P_OVER_PSTAR = np.asarray(fanno.critical_pressure_ratio(_M_GRID, GAMMA), dtype=float)
+    _P_OVER_P0 = np.asarray(isentropic.pressure_ratio(_M_GRID, GAMMA), dtype=float)
+    _FP_DESC = _FP_OF_M[::-1].copy()
+    _M_DESC = _M_GRID[::-1].copy()
+    _TABLE_BUILT = True
+
+
+def _critical_friction_parameter(M, gamma):
+    if gamma == GAMMA:
+        return np.interp(M, _M_GRID, _FP_OF_M)
+    return fanno.critical_friction_parameter(M, gamma)
+
+
+def _critical_pressure_ratio(M, gamma):
+    if gamma == GAMMA:
+        return np.interp(M, _M_GRID, _P_OVER_PSTAR)
+    return fanno.critical_pressure_ratio(M, gamma)
+
+
+def _pressure_ratio(M, gamma):
+    if gamma == GAMMA:
+        return np.interp(M, _M_GRID, _P_OVER_P0)
+    return isentropic.pressure_ratio(M, gamma)
+
+
+def _m_from_critical_friction_sub(fp, gamma):
+    if gamma == GAMMA:
+        return np.interp(fp, _FP_DESC, _M_DESC)
+    return fanno.m_from_critical_friction(fp, 'sub', gamma)
+
+
+# Compiled as ufuncs: the same kernel serves scalar calls and the array
+# residuals of compute_flow_vec
+@vectorize(['float64(float64, float64, float64)'], cache=True, fastmath=True)
+def _haaland(Re, D, epsilon):
+    if Re < 2300.0:
+        return 64.0 / Re if Re > 0.0 else 0.0
+    t = (epsilon / (3.7 * D))**1.11 + 6.9 / Re
+    x = -1.8 * math.log10(t)
+    return 1.0 / (x * x)
+
+
+@vectorize(['float64(float64, float64, float64)'], cache=True, fastmath=True)
+def _mdot_core(M, K, gamma):
+    # K = A * P0 / sqrt(R*T0) * sqrt(gamma), constant for a given tube and supply
+    return K * M * math.pow(1.0 + (gamma - 1.0) / 2.0 * M * M, -(gamma + 1.0) / (2.0 * (gamma - 1.0)))
+
+
+@vectorize(['float64(float64, float64, float64, float64, float64)'], cache=True, fastmath=True)
+def _mdot_from_mach(M, P0, T0, A, gamma):
+    return _mdot_core(M, A * P0 / math.sqrt(R * T0) * math.sqrt(gamma), gamma)
+
 
 def friction_factor_haaland(Re, D, epsilon):
     """
@@ -40,10 +125,7 @@ def friction_factor_haaland(Re, D, epsilon):
     f : float
         Darcy friction factor
     """
-    if Re < 2300:
-        return 64.0 / Re if Re > 0 else 0.0
-    term = (epsilon / (3.7 * D))**1.11 + (6.9 / Re)
-    return (-1.8 * np.log10(term))**-2
+    return _haaland(Re, D, epsilon)
 
 
 def mass_flow_from_mach(M, P0, T0, A, gamma=GAMMA):
@@ -71,12 +153,11 @@ def mass_flow_from_mach(M, P0, T0, A, gamma=GAMMA):
     m_dot : float
         Mass flow rate (kg/s)
     """
-    term = (1 + (gamma - 1) / 2 * M**2)**(-(gamma + 1) / (2 * (gamma - 1)))
-    return A * P0 / np.sqrt(R * T0) * np.sqrt(gamma) * M * term
+    return _mdot_from_mach(M, P0, T0, A, gamma)
 
 
 def compute_flow(diameter_mm, length_m, P_inlet_psi, P_outlet_pa=P_ATM, 
-                 T0_K=293.15, roughness_mm=0.0015, gamma=GAMMA):
+                 T0_K=293.15, roughness_mm=0.0015, gamma=GAMMA, M1_hint=None):
     """
     Compute volumetric flow rate through a tube using Fanno flow analysis.
     
@@ -96,84 +177,128 @@ def compute_flow(diameter_mm, length_m, P_inlet_psi, P_outlet_pa=P_ATM,
         Surface roughness (mm), default 0.0015 (smooth tubing)
     gamma : float, optional
         Specific heat ratio, default 1.4 (air)
+    M1_hint : float, optional
+        Expected inlet Mach number, e.g. M_inlet of the previous point of a
+        sweep. The subsonic search first tries [0.5, 1.5] * M1_hint and falls
+        back to the full bracket if the root is not inside it.
     
     Returns
     -------
-    dict with keys:
-        'Q_std' : Volumetric flow rate at standard conditions (m³/s)
-        'Q_slpm' : Volumetric flow rate (standard liters per minute)
-        'm_dot' : Mass flow rate (kg/s)
-        'M_inlet' : Inlet Mach number
-        'M_outlet' : Outlet Mach number  
-        'choked' : Whether flow is choked
-        'P_exit' : Exit pressure (Pa)
+    FlowResult with fields:
+        Q_std : Volumetric flow rate at standard conditions (m³/s)
+        Q_slpm : Volumetric flow rate (standard liters per minute)
+        m_dot : Mass flow rate (kg/s)
+        M_inlet : Inlet Mach number
+        M_outlet : Outlet Mach number  
+        choked : Whether flow is choked
+        P_exit : Exit pressure (Pa)
+        error : None, or a message if no solution was found (flow fields NaN)
+    
+    Results are memoized on the inputs rounded to 9 significant figures, since
+    sweeps repeat many argument sets; FlowResult is immutable, so sharing is safe.
+    Calls with M1_hint bypass the memo, as the hint is not part of the answer.
     """
+    args = tuple(_round_sig(x) for x in (
+        diameter_mm, length_m, P_inlet_psi, P_outlet_pa, T0_K, roughness_mm, gamma))
+    if M1_hint is None:
+        return _compute_flow_cached(*args)
+    return _compute_flow_impl(*args, M1_hint=M1_hint)
+
+
+def _round_sig(x, sig=9):
+    """Round to sig significant figures so nearly-equal floats share a cache key."""
+    return float(f"{x:.{sig}g}")
+
+
+@lru_cache(maxsize=4096)
+def _compute_flow_cached(diameter_mm, length_m, P_inlet_psi, P_outlet_pa, T0_K, roughness_mm, gamma):
+    return _compute_flow_impl(
+        diameter_mm, length_m, P_inlet_psi, P_outlet_pa, T0_K, roughness_mm, gamma)
+
+
+def _compute_flow_impl(diameter_mm, length_m, P_inlet_psi, P_outlet_pa, T0_K, roughness_mm, gamma,
+                       M1_hint=None):
+    """Uncached body of compute_flow."""
     # Convert units
     D = diameter_mm / 1000.0  # m
     A = np.pi * (D / 2)**2    # m²
     epsilon = roughness_mm / 1000.0  # m
-    P0 = (P_inlet_psi * 6894.76) + P_ATM  # Pa (absolute)
+    P0 = (P_inlet_psi * PA_PER_PSI) + P_ATM  # Pa (absolute)
+    if gamma == GAMMA and not _TABLE_BUILT:
+        _build_tables()
     
-    # --- Step 1: Find the choked flow condition ---
-    # Solve for M1 where: 4fL*/D (at M1) = 4fL/D (consumed by pipe)
+    # Loop invariants of both residuals
+    Re_per_mdot = 4.0 / (np.pi * D * MU)                   # Re = m_dot * Re_per_mdot
+    L_over_D = length_m / D
+    K_mdot = A * P0 / math.sqrt(R * T0_K) * math.sqrt(gamma)  # m_dot = _mdot_core(M, K_mdot, gamma)
     
-    def choked_residual(M1):
-        """Residual for finding inlet Mach that makes flow exactly choked."""
-        m_dot = mass_flow_from_mach(M1, P0, T0_K, A, gamma)
-        Re = 4 * m_dot / (np.pi * D * MU)
-        f = friction_factor_haaland(Re, D, epsilon)
+    # --- Step 0: Screen out clearly subsonic cases ---
+    # Isothermal-pipe exit Mach with f = 0.03 (closed form). If even that is
+    # far from sonic the pipe cannot choke, so skip the choked solve and search
+    # the whole subsonic bracket directly.
+    if P_outlet_pa >= P0:
+        M_est = 0.0
+    elif P_outlet_pa <= 0 or length_m <= 0:
+        M_est = math.inf
+    else:
+        G2 = (P0**2 - P_outlet_pa**2) / (0.03 * L_over_D + 2 * math.log(P0 / P_outlet_pa))
+        M_est = math.sqrt(G2 / gamma) / P_outlet_pa
+    
+    if M_est < 0.2:
+        M1_choked = 0.9999
+    else:
+        # --- Step 1: Find the choked flow condition ---
+        # Solve for M1 where: 4fL*/D (at M1) = 4fL/D (consumed by pipe)
+    
+        def choked_residual(M1):
+            """Residual for finding inlet Mach that makes flow exactly choked."""
+            m_dot = _mdot_core(M1, K_mdot, gamma)
+            Re = m_dot * Re_per_mdot
+            f = _haaland(Re, D, epsilon)
         
-        # Use pygasflow for Fanno parameter
-        fp_available = fanno.critical_friction_parameter(M1, gamma)
-        fp_consumed = f * length_m / D
+            # Fanno parameter (tabulated pygasflow values)
+            fp_available = _critical_friction_parameter(M1, gamma)
+            fp_consumed = f * L_over_D
         
-        return fp_available - fp_consumed
+            return fp_available - fp_consumed
     
-    try:
-        sol = root_scalar(choked_residual, bracket=[1e-4, 0.9999], method='brentq')
-        M1_choked = sol.root
-    except ValueError:
-        return {'error': 'Could not find choked solution', 'Q_std': np.nan}
-    
-    # --- Step 2: Check if actually choked by comparing exit pressure ---
-    # Get pressure at sonic conditions (M=1)
-    # P1/P0 from isentropic, P*/P1 from Fanno
-    P1_over_P0 = isentropic.pressure_ratio(M1_choked, gamma)
-    P1 = P0 * P1_over_P0
-    
-    # P/P* from Fanno (this is P1/P*)
-    P1_over_Pstar = fanno.critical_pressure_ratio(M1_choked, gamma)
-    P_star = P1 / P1_over_Pstar  # Exit pressure if choked
-    
-    if P_star >= P_outlet_pa:
-        # Flow IS choked (M_exit = 1)
-        m_dot = mass_flow_from_mach(M1_choked, P0, T0_K, A, gamma)
-        Q_std = m_dot / RHO_STD
+        try:
+            M1_choked = brentq(choked_residual, 1e-4, 0.9999, xtol=1e-8, maxiter=60)
+        except (ValueError, RuntimeError):
+            return _flow_error('Could not find choked solution')
+    
+        # --- Step 2: Check if actually choked by comparing exit pressure ---
+        # Get pressure at sonic conditions (M=1)
+        # P1/P0 from isentropic, P*/P1 from Fanno
+        # (tabulated like the residuals, so the choked/subsonic split agrees with them)
+        P1_over_P0 = _pressure_ratio(M1_choked, gamma)
+        P1 = P0 * P1_over_P0
+    
+        # P/P* from Fanno (this is P1/P*)
+        P1_over_Pstar = _critical_pressure_ratio(M1_choked, gamma)
+        P_star = P1 / P1_over_Pstar  # Exit pressure if choked
+    
+        if P_star >= P_outlet_pa:
+            # Flow IS choked (M_exit = 1)
+            m_dot = mass_flow_from_mach(M1_choked, P0, T0_K, A, gamma)
+            Q_std = m_dot / RHO_STD
         
-        return {
-            'Q_std': Q_std,
-            'Q_m3ps': Q_std,  #  m³/s 
-            'm_dot': m_dot,
-            'M_inlet': M1_choked,
-            'M_outlet': 1.0,
-            'choked': True,
-            'P_exit': P_star
-        }
+            return FlowResult(Q_std, Q_std * 60000, m_dot, M1_choked, 1.0, True, P_star, None)
     
     # --- Step 3: Subsonic (unchoked) case ---
     # Find M1 such that exit pressure equals P_outlet
     
     def subsonic_residual(M1):
         """Residual for matching exit pressure to atmospheric."""
-        m_dot = mass_flow_from_mach(M1, P0, T0_K, A, gamma)
-        Re = 4 * m_dot / (np.pi * D * MU)
-        f = friction_factor_haaland(Re, D, epsilon)
+        m_dot = _mdot_core(M1, K_mdot, gamma)
+        Re = m_dot * Re_per_mdot
+        f = _haaland(Re, D, epsilon)
         
         # Fanno parameter consumed
-        fp_consumed = f * length_m / D
+        fp_consumed = f * L_over_D
         
         # Fanno parameter available at M1
-        fp_at_M1 = fanno.critical_friction_parameter(M1, gamma)
+        fp_at_M1 = _critical_friction_parameter(M1, gamma)
         
         # Remaining Fanno parameter at exit
         fp_at_M2 = fp_at_M1 - fp_consumed
@@ -183,49 +308,202 @@ def compute_flow(diameter_mm, length_m, P_inlet_psi, P_outlet_pa=P_ATM,
         
         # Find M2 from remaining friction parameter (subsonic branch)
         try:
-            M2 = fanno.m_from_critical_friction(fp_at_M2, 'sub', gamma)
+            M2 = _m_from_critical_friction_sub(fp_at_M2, gamma)
         except:
             return -1e9
         
         # Compute exit pressure using Fanno pressure ratios
         # P1/P* and P2/P* -> P2 = P1 * (P2/P*) / (P1/P*)
-        P1_over_Pstar = fanno.critical_pressure_ratio(M1, gamma)
-        P2_over_Pstar = fanno.critical_pressure_ratio(M2, gamma)
+        P1_over_Pstar = _critical_pressure_ratio(M1, gamma)
+        P2_over_Pstar = _critical_pressure_ratio(M2, gamma)
         
-        P1 = P0 * isentropic.pressure_ratio(M1, gamma)
+        P1 = P0 * _pressure_ratio(M1, gamma)
         P2 = P1 * P2_over_Pstar / P1_over_Pstar
         
         return P2 - P_outlet_pa
     
     try:
-        sol = root_scalar(subsonic_residual, bracket=[1e-4, M1_choked], method='brentq')
-        M1 = sol.root
+        M1 = None
+        if M1_choked < 0.9999 and subsonic_residual(M1_choked) >= 0:
+            # Right at the choking boundary: M1_choked is only known to xtol, and the
+            # few Pa of exit pressure that leaves is more than P_outlet sits below P*.
+            # The subsonic root is M1_choked itself.
+            M1 = M1_choked
+        if M1 is None and M1_hint is not None and M1_hint > 0:
+            # Warm start: M1 moves smoothly along a sweep, so a narrow bracket usually holds it
+            try:
+                M1 = brentq(subsonic_residual, max(1e-4, M1_hint * 0.5), min(M1_choked, M1_hint * 1.5),
+                            xtol=1e-8, maxiter=60)
+            except (ValueError, RuntimeError):
+                pass  # root not in the narrow bracket, or no convergence there: use the full one
+        if M1 is None:
+            M1 = brentq(subsonic_residual, 1e-4, M1_choked, xtol=1e-8, maxiter=60)
         
         # Recalculate final values
-        m_dot = mass_flow_from_mach(M1, P0, T0_K, A, gamma)
-        Re = 4 * m_dot / (np.pi * D * MU)
-        f = friction_factor_haaland(Re, D, epsilon)
+        m_dot = _mdot_core(M1, K_mdot, gamma)
+        Re = m_dot * Re_per_mdot
+        f = _haaland(Re, D, epsilon)
         # print(f)
         
-        fp_consumed = f * length_m / D
-        fp_at_M1 = fanno.critical_friction_parameter(M1, gamma)
-        fp_at_M2 = fp_at_M1 - fp_consumed
-        M2 = fanno.m_from_critical_friction(fp_at_M2, 'sub', gamma)
+        # Same (tabulated) relations the residual was solved with; near choking the
+        # exact pygasflow ones can put fp_at_M2 a hair below zero
+        fp_consumed = f * L_over_D
+        fp_at_M1 = _critical_friction_parameter(M1, gamma)
+        fp_at_M2 = max(fp_at_M1 - fp_consumed, 0.0)
+        M2 = _m_from_critical_friction_sub(fp_at_M2, gamma)
         
         Q_std = m_dot / RHO_STD
         
-        return {
-            'Q_std': Q_std,
-            'Q_slpm': Q_std * 60000,
-            'm_dot': m_dot,
-            'M_inlet': M1,
-            'M_outlet': float(M2),
-            'choked': False,
-            'P_exit': P_outlet_pa
-        }
+        return FlowResult(Q_std, Q_std * 60000, m_dot, M1, float(M2), False, P_outlet_pa, None)
+        
+    except (ValueError, RuntimeError):
+        return _flow_error('Could not find subsonic solution')
+
+
+def _flow_error(message):
+    return FlowResult(np.nan, np.nan, np.nan, np.nan, np.nan, False, np.nan, message)
+
+
+def _chandrupatla_vec(f, a, b, xtol=1e-10, maxiter=80):
+    """
+    Vectorized Chandrupatla root finder.
+    
+    Solves f(x)[i] = 0 on [a[i], b[i]] for every i at once; f takes and returns
+    arrays of the same shape as a. Entries whose bracket has no sign change
+    come back as NaN.
+    
+    Parameters
+    ----------
+    f : callable
+        Vector residual
+    a, b : array_like
+        Bracket ends
+    xtol : float
+        Absolute tolerance on the root
+    maxiter : int
+        Maximum number of iterations
+    
+    Returns
+    -------
+    x : ndarray
+        Roots
+    """
+    eps = np.finfo(float).eps
+    b, a = np.broadcast_arrays(np.asarray(a, dtype=float), np.asarray(b, dtype=float))
+    b, a = b.copy(), a.copy()
+    fb, fa = f(b), f(a)
+    valid = np.sign(fa) * np.sign(fb) <= 0
+    root = np.full(a.shape, np.nan)
+    done = ~valid
+    t = np.full(a.shape, 0.5)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for _ in range(maxiter):
+            xt = a + t * (b - a)
+            ft = f(xt)
+            samesign = np.sign(ft) == np.sign(fa)
+            c = np.where(samesign, a, b)
+            fc = np.where(samesign, fa, fb)
+            b = np.where(samesign, b, a)
+            fb = np.where(samesign, fb, fa)
+            a, fa = xt, ft
+            
+            fa_smaller = np.abs(fa) < np.abs(fb)
+            xm = np.where(fa_smaller, a, b)
+            fm = np.where(fa_smaller, fa, fb)
+            tol = 2 * eps * np.abs(xm) + xtol
+            tlim = tol / np.abs(b - c)
+            converged = ~done & ((fm == 0) | (tlim > 0.5))
+            root[converged] = xm[converged]
+            done |= converged
+            if done.all():
+                break
+            
+            # Inverse quadratic interpolation where it is safe, bisection otherwise
+            xi = (a - b) / (c - b)
+            phi = (fa - fb) / (fc - fb)
+            iqi = (phi**2 < xi) & ((1 - phi)**2 < 1 - xi)
+            t_iqi = (fa / (fb - fa) * fc / (fb - fc)
+                     + (c - a) / (b - a) * fa / (fc - fa) * fb / (fc - fb))
+            t = np.where(iqi, t_iqi, 0.5)
+            t = np.minimum(1 - tlim, np.maximum(tlim, t))
+            # Keep finished entries finite so they don't poison later steps
+            t = np.where(done, 0.5, t)
+    
+    unfinished = ~done
+    root[unfinished] = xm[unfinished]
+    return root
+
+
+def compute_flow_vec(diameter_mm, length_m, P_inlet_psi, P_outlet_pa=P_ATM,
+                     T0_K=293.15, roughness_mm=0.0015, gamma=GAMMA):
+    """
+    Vectorized compute_flow: solves every case at once.
+    
+    length_m, P_inlet_psi and P_outlet_pa may be arrays and are broadcast
+    together; both root solves then run as a single _chandrupatla_vec call.
+    
+    Returns
+    -------
+    FlowResult of arrays, fields as in compute_flow (error is None).
+    Cases without a solution have NaN flow.
+    """
+    L, P_inlet_psi, P_outlet_pa = np.broadcast_arrays(
+        np.asarray(length_m, dtype=float), np.asarray(P_inlet_psi, dtype=float),
+        np.asarray(P_outlet_pa, dtype=float))
+    shape = L.shape
+    # Solve on flat copies; outputs are reshaped back to the broadcast shape
+    L, P_inlet_psi, P_outlet_pa = (x.ravel().copy() for x in (L, P_inlet_psi, P_outlet_pa))
+    D = diameter_mm / 1000.0  # m
+    A = np.pi * (D / 2)**2    # m²
+    epsilon = roughness_mm / 1000.0  # m
+    P0 = (P_inlet_psi * PA_PER_PSI) + P_ATM  # Pa (absolute)
+    if gamma == GAMMA and not _TABLE_BUILT:
+        _build_tables()
+    
+    Re_per_mdot = 4.0 / (np.pi * D * MU)
+    L_over_D = L / D
+    K_mdot = A * P0 / np.sqrt(R * T0_K) * np.sqrt(gamma)
+    
+    def fp_consumed_at(M1, idx):
+        m_dot = _mdot_core(M1, K_mdot[idx], gamma)
+        f = _haaland(m_dot * Re_per_mdot, D, epsilon)
+        return f * L_over_D[idx]
+    
+    # --- Step 1: choked inlet Mach for every case ---
+    everything = np.ones(L.shape, dtype=bool)
+    
+    def choked_residual(M1):
+        return _critical_friction_parameter(M1, gamma) - fp_consumed_at(M1, everything)
+    
+    M1 = _chandrupatla_vec(choked_residual, np.full(L.shape, 1e-4), np.full(L.shape, 0.9999))
+    
+    # --- Step 2: choked where the sonic exit pressure exceeds the outlet ---
+    P_star = P0 * _pressure_ratio(M1, gamma) / _critical_pressure_ratio(M1, gamma)
+    choked = P_star >= P_outlet_pa
+    M2 = np.where(choked, 1.0, np.nan)
+    P_exit = np.where(choked, P_star, P_outlet_pa)
+    
+    # --- Step 3: subsonic cases, exit pressure matched to P_outlet ---
+    sub = ~choked & ~np.isnan(M1)
+    if sub.any():
+        def subsonic_residual(M1_sub):
+            fp_at_M2 = _critical_friction_parameter(M1_sub, gamma) - fp_consumed_at(M1_sub, sub)
+            M2_sub = _m_from_critical_friction_sub(np.maximum(fp_at_M2, 0.0), gamma)
+            P1 = P0[sub] * _pressure_ratio(M1_sub, gamma)
+            P2 = P1 * _critical_pressure_ratio(M2_sub, gamma) / _critical_pressure_ratio(M1_sub, gamma)
+            return np.where(fp_at_M2 < 0, -1e9, P2 - P_outlet_pa[sub])
         
-    except ValueError:
-        return {'error': 'Could not find subsonic solution', 'Q_std': np.nan}
+        M1_sub = _chandrupatla_vec(subsonic_residual, np.full(int(sub.sum()), 1e-4), M1[sub])
+        M1[sub] = M1_sub
+        fp_at_M2 = _critical_friction_parameter(M1_sub, gamma) - fp_consumed_at(M1_sub, sub)
+        M2[sub] = _m_from_critical_friction_sub(fp_at_M2, gamma)
+    
+    m_dot = mass_flow_from_mach(M1, P0, T0_K, A, gamma)
+    Q_std = m_dot / RHO_STD
+    return FlowResult(Q_std.reshape(shape), (Q_std * 60000).reshape(shape), m_dot.reshape(shape),
+                      M1.reshape(shape), M2.reshape(shape), choked.reshape(shape),
+                      P_exit.reshape(shape), None)
 
 
 def compute_isothermal_flow(diameter_mm, length_m, P_inlet_pa, P_outlet_pa, 
@@ -269,62 +547,58 @@ def compute_isothermal_flow(diameter_mm, length_m, P_inlet_pa, P_outlet_pa,
 if __name__ == "__main__":
     import matplotlib.pyplot as plt
 
-    flows = []
-    
     lengths = np.linspace(0.2, 10.0, 50)
     psi_values = np.arange(5, 51, 10)
-    flows_by_psi = []
 
-    flows_by_psi = []
-    choked_flags_by_psi = []
+    # Every (psi, length) pair in one vectorized solve; rows are psi values
+    res = compute_flow_vec(diameter_mm=5.0, length_m=lengths[np.newaxis, :],
+                           P_inlet_psi=psi_values[:, np.newaxis])
+    flows_by_psi = res.Q_std
+    choked_flags_by_psi = res.choked
+
+    # Isothermal and engineering models, also as (psi, length) arrays
+    f = 0.021
+    P_in = psi_values[:, np.newaxis]*PA_PER_PSI + P_ATM
+    P_out = P_ATM
+    T0 = 293.15
+    D = 0.005
+    A = np.pi * (D / 2)**2    # m²
+    m_dot = A * np.sqrt( (P_in**2 - P_out**2) / (R * T0 * (f * lengths / D + 2*np.log(P_in/P_out))) )
+    q_isothermal_by_psi = m_dot/RHO_STD
+
+    # Engineering equation: ΔP = f * (L/D) * (ρ * v²/2)
+    # Solving for v: v = sqrt( (2 * ΔP * D) / (ρ * f * L) )
+    # Then Q = v * A
+    delta_P = P_in - P_out  # Pressure drop
+    P_avg = (P_in + P_out) / 2  # Average pressure for density calculation
+    rho_avg = P_avg / (R * T0)  # Average density using ideal gas law
+    two_dP_D_over_rhof = 2 * delta_P * D / (rho_avg * f)
 
-    for psi in psi_values:
-        flows = []
-        choked_flags = []
-        for L in lengths:
-            res = compute_flow(diameter_mm=5.0, length_m=L, P_inlet_psi=psi)
-            flows.append(res['Q_std'] if 'Q_std' in res else np.nan)
-            choked_flags.append(res.get('choked', False))
-        flows_by_psi.append(flows)
-        choked_flags_by_psi.append(choked_flags)
+    # Calculate velocity for each length
+    # Handle division by zero for L=0 case
+    v_engineering = np.sqrt(two_dP_D_over_rhof / np.maximum(lengths, 1e-6))
+    q_engineering_by_psi = v_engineering * A
 
     # Plot results
     plt.figure(figsize=(10, 6))
 
     # Define a colormap; use as many colors as there are psi_values
-    import matplotlib.pyplot as plt
-    colors = plt.cm.rainbow(np.linspace(0, 1, len(psi_values)))
+    colors = plt.cm.rainbow(np.linspace(0, 1, len(psi_values))).tolist()
+    labels_fanno = [f'Fanno {p} psi' for p in psi_values]
+    labels_iso = [f'isothermal {p} psi' for p in psi_values]
+    labels_eng = [f'engineering {p} psi' for p in psi_values]
 
     for i, psi in enumerate(psi_values):
         color = colors[i]
 
         # Fanno
-        plt.plot(lengths, flows_by_psi[i], '-', color=color, label=f'Fanno {psi} psi')
+        plt.plot(lengths, flows_by_psi[i], '-', color=color, label=labels_fanno[i])
 
         # Isothermal flow calculation
-        f = 0.021
-        P_in = psi*6894.76 + P_ATM
-        P_out = P_ATM
-        T0 = 293.15
-        D = 0.005
-        A = np.pi * (D / 2)**2    # m²
-        m_dot = A * np.sqrt( (P_in**2 - P_out**2) / (R * T0 * (f * lengths / D + 2*np.log(P_in/P_out))) )
-        q_isothermal = m_dot/RHO_STD
-        plt.plot(lengths, q_isothermal, '--', color=color, label=f'isothermal {psi} psi')
+        plt.plot(lengths, q_isothermal_by_psi[i], '--', color=color, label=labels_iso[i])
 
-        
-        # Engineering equation: ΔP = f * (L/D) * (ρ * v²/2)
-        # Solving for v: v = sqrt( (2 * ΔP * D) / (ρ * f * L) )
-        # Then Q = v * A
-        delta_P = P_in - P_out  # Pressure drop
-        P_avg = (P_in + P_out) / 2  # Average pressure for density calculation
-        rho_avg = P_avg / (R * T0)  # Average density using ideal gas law
-        
-        # Calculate velocity for each length
-        # Handle division by zero for L=0 case
-        v_engineering = np.sqrt((2 * delta_P * D) / (rho_avg * f * np.maximum(lengths, 1e-6)))
-        q_engineering = v_engineering * A
-        plt.plot(lengths, q_engineering, ':', color=color, label=f'engineering {psi} psi')
+        # Engineering equation
+        plt.plot(lengths, q_engineering_by_psi[i], ':', color=color, label=labels_eng[i])
 
         
     plt.xlabel('Tube Length (m)', fontsize=12)
@@ -349,11 +623,14 @@ if __name__ == "__main__":
     # Vary outlet pressure from very low to inlet pressure
     # Use a few different inlet pressures
     inlet_psi_values = np.arange(10,51, 10)
-    colors_pressure = plt.cm.rainbow(np.linspace(0, 1, len(inlet_psi_values)))
+    colors_pressure = plt.cm.rainbow(np.linspace(0, 1, len(inlet_psi_values))).tolist()
+    labels_fanno = [f'Fanno, P_in={p} psi' for p in inlet_psi_values]
+    labels_iso = [f'Isothermal, P_in={p} psi' for p in inlet_psi_values]
+    labels_simp = [f'simp, P_in={p} psi' for p in inlet_psi_values]
     
     for i, inlet_psi in enumerate(inlet_psi_values):
         color = colors_pressure[i]
-        P_inlet_pa = inlet_psi * 6894.76 + P_ATM
+        P_inlet_pa = inlet_psi * PA_PER_PSI + P_ATM
         
         # Vary outlet pressure from 0.1*P_inlet to P_inlet (but not above P_inlet)
         P_outlet_range = np.linspace(P_ATM, 1 * P_inlet_pa, 100)
@@ -362,13 +639,15 @@ if __name__ == "__main__":
         q_fanno = []
         q_isothermal = []
         q_isothermal_simp = []
+        M1_hint = None  # inlet Mach of the previous outlet pressure, warm-starts the next solve
         
         for P_out in P_outlet_range:
             # Fanno flow
-            P_inlet_gauge_psi = (P_inlet_pa - P_ATM) / 6894.76
+            P_inlet_gauge_psi = (P_inlet_pa - P_ATM) * INV_PA_PER_PSI
             res = compute_flow(diameter_mm=fixed_diameter_mm, length_m=fixed_length,
-                             P_inlet_psi=P_inlet_gauge_psi, P_outlet_pa=P_out)
-            q_fanno.append(res['Q_std'] if 'Q_std' in res else np.nan)
+                             P_inlet_psi=P_inlet_gauge_psi, P_outlet_pa=P_out, M1_hint=M1_hint)
+            q_fanno.append(res.Q_std)
+            M1_hint = res.M_inlet
             
             # Isothermal flow
             q_iso = compute_isothermal_flow(diameter_mm=fixed_diameter_mm, length_m=fixed_length,
@@ -385,17 +664,17 @@ if __name__ == "__main__":
             # print(Q_std)
         
         # Convert outlet pressure to psi for plotting
-        P_outlet_psi = (P_outlet_range) / 6894.76
+        P_outlet_psi = P_outlet_range * INV_PA_PER_PSI
         
         # Plot Fanno flow
         plt.plot(P_outlet_psi, q_fanno, '-', color=color, linewidth=2, 
-                label=f'Fanno, P_in={inlet_psi} psi')
+                label=labels_fanno[i])
         # Plot isothermal flow
         plt.plot(P_outlet_psi, q_isothermal, '--', color=color, linewidth=2,
-                label=f'Isothermal, P_in={inlet_psi} psi')
+                label=labels_iso[i])
         # Plot isothermal flow
         plt.plot(P_outlet_psi, q_isothermal_simp, ':', color=color, linewidth=5,
-                label=f'simp, P_in={inlet_psi} psi')
+                label=labels_simp[i])
     
     plt.xlabel('Outlet Pressure (psi)', fontsize=12)
     plt.ylabel('Volumetric Flow Rate (m$^3$/s)', fontsize=12)
@@ -403,7 +682,7 @@ if __name__ == "__main__":
     plt.grid(True, alpha=0.3)
     plt.legend(title='Model & Inlet Pressure', fontsize=9, loc="upper right")
     plt.tight_layout()
-    plt.axvline(P_ATM/ 6894.76, color='k')
+    plt.axvline(P_ATM * INV_PA_PER_PSI, color='k')
     plt.xlim(0,None)
     plt.show()
 
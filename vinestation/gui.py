@@ -2,6 +2,7 @@ import tkinter as tk
 import serial
 import serial.tools.list_ports
 import threading
+import queue
 import time
 import json
 from websockets.sync.client import connect
@@ -20,9 +21,20 @@ class MotorControlGUI:
         self.repeat_job = None
         self.ignore_slider_event = False
         self.offset = None
+        # Start of a line that readline() cut off at its timeout
+        self._partial = b''
+        # Wire rate limit for targets; the display still updates on every change.
+        # Slider drags fire far faster than this; the 50 ms hold-to-repeat tick does not.
+        self.send_interval = 0.03
+        self._last_send_ts = 0.0
+        self._pending = False
         
         self.ws_url = "ws://192.168.1.27/websocket"
         
+        # Serial command framing, kept as bytes so sends skip str formatting + encode
+        self._M_PREFIX = b"M"
+        self._NL = b"\n"
+        
         # UI Setup
         self.setup_ui()
         
@@ -31,6 +43,10 @@ class MotorControlGUI:
         self.thread = threading.Thread(target=self.serial_loop)
         self.thread.daemon = True
         self.thread.start()
+        
+        # Servo commands go through one long-lived websocket instead of a handshake per click
+        self._ws_q = queue.Queue()
+        threading.Thread(target=self._ws_worker, daemon=True).start()
 
     def setup_ui(self):
         # Connection Status
@@ -121,7 +137,7 @@ class MotorControlGUI:
                 port = self.find_port()
                 if port:
                     try:
-                        self.serial_port = serial.Serial(port, 921600, timeout=0.1)
+                        self.serial_port = serial.Serial(port, 921600, timeout=0.05)
                         self.connected = True
                         self.status_var.set(f"Connected: {port}")
                         time.sleep(2)
@@ -133,27 +149,38 @@ class MotorControlGUI:
                 continue
 
             try:
-                if self.serial_port.in_waiting:
-                    lines = self.serial_port.read_all().decode('utf-8', errors='ignore').strip().split('\n')
-                    if lines:
-                        last_line = lines[-1]
-                        try:
-                            val = float(last_line)
-                            if self.offset is None:
-                                self.offset = val
-                            
-                            self.current_pos = val - self.offset
-                            self.root.after(0, self.update_gui_from_serial)
-                        except ValueError:
-                            pass 
+                # Blocks in the OS read until a full line arrives (or the timeout), no polling
+                # A timeout returns whatever arrived so far; keep it for the next read
+                # instead of parsing half a number (or its tail as a number)
+                line = self._partial + self.serial_port.readline()
+                self._partial = b''
+                if not line.endswith(b'\n'):
+                    self._partial = line
+                    continue
+                # Only the newest position matters; skip lines that queued up behind it
+                while self.serial_port.in_waiting:
+                    newer = self.serial_port.readline()
+                    if newer.endswith(b'\n'):
+                        line = newer
+                    else:
+                        self._partial = newer
+                        break
+                try:
+                    val = float(line)
+                    if self.offset is None:
+                        self.offset = val
+                    
+                    self.current_pos = val - self.offset
+                    self.root.after(0, self.update_gui_from_serial)
+                except ValueError:
+                    pass 
             except Exception as e:
                 self.connected = False
                 self.offset = None
+                self._partial = b''
                 self.status_var.set("Disconnected")
                 if self.serial_port:
                     self.serial_port.close()
-            
-            time.sleep(0.001)
 
     def update_gui_from_serial(self):
         self.curr_pos_var.set(f"{self.current_pos:.2f}")
@@ -176,38 +203,64 @@ class MotorControlGUI:
             self.curr_scale.configure(from_=self.min_bound, to=self.max_bound)
             self.target_scale.configure(from_=self.min_bound, to=self.max_bound)
 
-    def send_target(self):
+    def send_target(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_send_ts < self.send_interval:
+            # Coalesce: remember there is a newer target and send it once the interval is up
+            if not self._pending:
+                self._pending = True
+                delay_ms = int((self.send_interval - (now - self._last_send_ts)) * 1000) + 1
+                self.root.after(delay_ms, self.flush_target)
+            return
+        self._pending = False
+        self._last_send_ts = now
         if self.connected and self.serial_port:
             try:
                 actual_target = self.target_pos + (self.offset if self.offset else 0.0)
-                msg = f"M{actual_target}\n"
-                self.serial_port.write(msg.encode('utf-8'))
+                self.serial_port.write(self._M_PREFIX + (b"%.4f" % actual_target) + self._NL)
             except Exception:
                 pass
 
+    def flush_target(self):
+        if self._pending:
+            self.send_target(force=True)
+
     def toggle_gpio(self, pin):
         if self.connected and self.serial_port:
             try:
                 state = self.gpio_vars[pin].get()
-                msg = f"P{pin}:{state}\n"
-                self.serial_port.write(msg.encode('utf-8'))
+                self.serial_port.write(b"P%d:%d\n" % (pin, state))
             except Exception:
                 pass
 
     def send_servo_cmd(self, angle):
-        threading.Thread(target=self._send_servo_ws, args=(angle,), daemon=True).start()
+        self._ws_q.put(angle)
 
-    def _send_servo_ws(self, angle):
-        try:
-            with connect(self.ws_url) as websocket:
-                msg = json.dumps({"angle": angle})
-                websocket.send(msg)
-                print(f"Sent Servo: {msg}")
-        except Exception as e:
-            print(f"Servo Error: {e}")
+    def _ws_worker(self):
+        angle = None
+        while self.running:
+            # Connect lazily on the first command, then keep the socket for the next ones
+            if angle is None:
+                angle = self._ws_q.get()
+            try:
+                with connect(self.ws_url) as websocket:
+                    while True:
+                        msg = json.dumps({"angle": angle})
+                        websocket.send(msg)
+                        print(f"Sent Servo: {msg}")
+                        angle = self._ws_q.get()
+            except Exception as e:
+                # angle is kept, so the command that hit the dead socket is resent after reconnecting
+                print(f"Servo Error: {e}")
+                time.sleep(1)
+                # Only the newest angle matters once we are back
+                while not self._ws_q.empty():
+                    angle = self._ws_q.get_nowait()
 
     def on_slider_change(self, val):
         if self.ignore_slider_event:
+            # Echo of our own target_scale.set(); swallow it once
+            self.ignore_slider_event = False
             return
         
         self.target_pos = float(val)
@@ -215,16 +268,16 @@ class MotorControlGUI:
         self.send_target()
 
     def set_target_programmatically(self, val):
-        self.ignore_slider_event = True
         self.target_pos = val
         self.target_entry_var.set(f"{val:.2f}")
-        self.autoscale(val)
-        self.target_scale.set(val)
+        # Only reconfigure the scales when the value actually leaves the range
+        if val < self.min_bound or val > self.max_bound:
+            self.autoscale(val)
+        # Within half the slider resolution Tk would not move it (nor fire on_slider_change)
+        if abs(self.target_scale.get() - val) >= 0.005:
+            self.ignore_slider_event = True
+            self.target_scale.set(val)
         self.send_target()
-        self.root.after(10, self.enable_slider_events)
-
-    def enable_slider_events(self):
-        self.ignore_slider_event = False
 
     def on_entry_change(self, event):
         try:
@@ -245,6 +298,9 @@ class MotorControlGUI:
         if self.repeat_job:
             self.root.after_cancel(self.repeat_job)
             self.repeat_job = None
+        # Make sure the final target reaches the board if the last tick was throttled
+        if self._pending:
+            self.send_target(force=True)
 
 if __name__ == "__main__":
     root = tk.Tk()
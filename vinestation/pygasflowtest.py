@@ -5,21 +5,44 @@ GAMMA = 1.4
 
 # --- Your implementation from fanno.py ---
 def get_fanno_parameter(M):
-    """Your implementation of 4fL*/D (friction parameter)"""
-    if M <= 0 or M >= 1: return np.inf
-    term1 = (1 - M**2) / (GAMMA * M**2)
-    term2 = (GAMMA + 1) / (2 * GAMMA) * np.log(((GAMMA + 1) * M**2) / (2 + (GAMMA - 1) * M**2))
-    return term1 + term2
+    """Your implementation of 4fL*/D (friction parameter), element-wise over M"""
+    M = np.asarray(M, dtype=np.float64)
+    M2 = M * M
+    # Out-of-range Machs are masked to inf below; silence the log/divide warnings they raise
+    with np.errstate(divide='ignore', invalid='ignore'):
+        term1 = (1 - M2) / (GAMMA * M2)
+        term2 = (GAMMA + 1) / (2 * GAMMA) * np.log(((GAMMA + 1) * M2) / (2 + (GAMMA - 1) * M2))
+        return np.where((M <= 0) | (M >= 1), np.inf, term1 + term2)
 
 def your_P_ratio(M):
     """P/P* ratio (derived from line 80 in fanno.py)"""
-    return (1/M) * np.sqrt((2 + (GAMMA-1)*M**2)/(GAMMA+1))
+    M = np.asarray(M, dtype=np.float64)
+    return (1/M) * np.sqrt((2 + (GAMMA-1)*M*M)/(GAMMA+1))
 
 def your_T_ratio(M):
     """T/T* ratio"""
-    return (GAMMA+1) / (2 + (GAMMA-1)*M**2)
+    M = np.asarray(M, dtype=np.float64)
+    return (GAMMA+1) / (2 + (GAMMA-1)*M*M)
+
+def error_pct(yours, theirs):
+    """Relative error in percent, 0 where the reference is not positive"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(theirs > 0, np.abs(yours - theirs) / theirs * 100, 0)
 
 # --- COMPARISON ---
+# One batched pygasflow call covers every table below (the P/T Machs are a subset)
+M_arr = np.array([0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95])
+result = fanno_solver('m', M_arr, gamma=GAMMA)
+ratio_rows = np.flatnonzero(np.isin(M_arr, [0.2, 0.4, 0.5, 0.6, 0.8, 0.9]))
+
+# All the math happens here in one pass per table; the loops below only format rows
+yours_fp, theirs_fp = get_fanno_parameter(M_arr), result[6]  # index 6 is 4fL*/D
+yours_P, theirs_P = your_P_ratio(M_arr), result[1]           # index 1 is P/P*
+yours_T, theirs_T = your_T_ratio(M_arr), result[3]           # index 3 is T/T*
+err_fp = error_pct(yours_fp, theirs_fp)
+err_P = error_pct(yours_P, theirs_P)
+err_T = error_pct(yours_T, theirs_T)
+
 print("=" * 75)
 print("  COMPARISON: Your fanno.py vs pygasflow library")
 print("=" * 75)
@@ -29,11 +52,8 @@ print("-" * 75)
 print(f"{'Mach':^8} | {'Your 4fL*/D':^14} | {'pygasflow 4fL*/D':^16} | {'Error (%)':^12}")
 print("-" * 75)
 
-for M in [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95]:
-    yours = get_fanno_parameter(M)
-    result = fanno_solver('m', M, gamma=GAMMA)
-    theirs = result[6]  # index 6 is 4fL*/D
-    diff_pct = abs(yours - theirs) / theirs * 100 if theirs > 0 else 0
+for i, M in enumerate(M_arr):
+    yours, theirs, diff_pct = yours_fp[i], theirs_fp[i], err_fp[i]
     status = "✓" if diff_pct < 0.01 else "✗"
     print(f"{M:^8.2f} | {yours:^14.6f} | {theirs:^16.6f} | {diff_pct:^10.6f} {status}")
 
@@ -42,11 +62,9 @@ print("-" * 75)
 print(f"{'Mach':^8} | {'Your P/P*':^14} | {'pygasflow P/P*':^16} | {'Error (%)':^12}")
 print("-" * 75)
 
-for M in [0.2, 0.4, 0.5, 0.6, 0.8, 0.9]:
-    yours = your_P_ratio(M)
-    result = fanno_solver('m', M, gamma=GAMMA)
-    theirs = result[1]  # index 1 is P/P*
-    diff_pct = abs(yours - theirs) / theirs * 100 if theirs > 0 else 0
+for i in ratio_rows:
+    M = M_arr[i]
+    yours, theirs, diff_pct = yours_P[i], theirs_P[i], err_P[i]
     status = "✓" if diff_pct < 0.01 else "✗"
     print(f"{M:^8.2f} | {yours:^14.6f} | {theirs:^16.6f} | {diff_pct:^10.6f} {status}")
 
@@ -55,11 +73,9 @@ print("-" * 75)
 print(f"{'Mach':^8} | {'Your T/T*':^14} | {'pygasflow T/T*':^16} | {'Error (%)':^12}")
 print("-" * 75)
 
-for M in [0.2, 0.4, 0.5, 0.6, 0.8, 0.9]:
-    yours = your_T_ratio(M)
-    result = fanno_solver('m', M, gamma=GAMMA)
-    theirs = result[3]  # index 3 is T/T*
-    diff_pct = abs(yours - theirs) / theirs * 100 if theirs > 0 else 0
+for i in ratio_rows:
+    M = M_arr[i]
+    yours, theirs, diff_pct = yours_T[i], theirs_T[i], err_T[i]
     status = "✓" if diff_pct < 0.01 else "✗"
     print(f"{M:^8.2f} | {yours:^14.6f} | {theirs:^16.6f} | {diff_pct:^10.6f} {status}")
 